@@ -1,12 +1,21 @@
+import asyncio
 import io
 import os
-from typing import List, Any
+import queue
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, List, Any
 
+import cv2
 import numpy as np
 from fastapi import FastAPI, File, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+import pymupdf
 from paddleocr import PaddleOCR
-from pdf2image import convert_from_bytes
 from PIL import Image
 import uvicorn
 
@@ -14,9 +23,28 @@ import uvicorn
 OCR_LANG = os.getenv("PADDLE_LANG", "en")
 OCR_PORT = int(os.getenv("PADDLE_PORT", "6000"))
 OCR_HOST = os.getenv("PADDLE_HOST", "0.0.0.0")
+# Text lines recognised per batch; PaddleOCR's default of 6 means many
+# small recognizer launches for a dense page
+OCR_REC_BATCH = int(os.getenv("PADDLE_REC_BATCH", "32"))
+# Inference backend. GPU is used when Paddle was built with CUDA and falls
+# back to CPU otherwise; TensorRT needs the TensorRT libraries installed.
+# PADDLE_PRECISION=fp16 runs TensorRT in FP16 on GPU and MKL-DNN in BF16 on CPU.
+OCR_USE_GPU = os.getenv("PADDLE_USE_GPU", "true").lower() == "true"
+OCR_USE_TENSORRT = os.getenv("PADDLE_USE_TENSORRT", "false").lower() == "true"
+OCR_PRECISION = os.getenv("PADDLE_PRECISION", "fp32")
+# Engines loaded per process; each one holds its own copy of the models
+OCR_POOL_SIZE = int(os.getenv("PADDLE_POOL_SIZE", "2"))
+
+# Max rendered pages buffered between the PDF renderer and the OCR worker
+PIPELINE_DEPTH = 4
 
 # ---------- App + CORS ----------
-app = FastAPI(title="PaddleOCR Microservice", version="1.0.0")
+# orjson serialises the long per-page result lists much faster than json
+app = FastAPI(
+    title="PaddleOCR Microservice",
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
 
 # Adjust allowed origins as needed (for n8n Cloud, put your domain here)
 allowed_origins = os.getenv("PADDLE_ALLOWED_ORIGINS", "*").split(",")
@@ -30,10 +58,38 @@ app.add_middleware(
 )
 
 # ---------- OCR Engine ----------
-ocr_engine = PaddleOCR(
-    use_textline_orientation=True,   # replaces use_angle_cls
-    lang=OCR_LANG
-)
+def create_engine() -> PaddleOCR:
+    engine = PaddleOCR(
+        use_angle_cls=True,   # PaddleOCR 2.x; loads the classifier that cls=True runs
+        lang=OCR_LANG,
+        rec_batch_num=OCR_REC_BATCH,
+        use_gpu=OCR_USE_GPU,
+        use_tensorrt=OCR_USE_TENSORRT,
+        precision=OCR_PRECISION,
+        enable_mkldnn=True,
+        # Split the cores between engines rather than oversubscribing them
+        cpu_threads=max(1, (os.cpu_count() or 1) // OCR_POOL_SIZE),
+    )
+    # Run one dummy inference at startup so model loading and TensorRT engine
+    # building happen before the first real request instead of during it
+    engine.ocr(np.zeros((640, 640, 3), dtype=np.uint8), cls=True)
+    return engine
+
+
+# Paddle predictors are not thread-safe, so each engine serves one call at a
+# time; idle engines wait in this queue and callers block until one is free
+ocr_engines: queue.Queue = queue.Queue()
+for _ in range(OCR_POOL_SIZE):
+    ocr_engines.put(create_engine())
+
+
+def run_ocr(img_np: np.ndarray) -> List[Any]:
+    """Run PaddleOCR on one image with a pooled engine, safe to call from any thread."""
+    engine = ocr_engines.get()
+    try:
+        return engine.ocr(img_np, cls=True)
+    finally:
+        ocr_engines.put(engine)
 
 
 def normalize_result(ocr_raw: List[Any]) -> List[dict]:
@@ -44,19 +100,141 @@ def normalize_result(ocr_raw: List[Any]) -> List[dict]:
       ...
     ]
     """
-    normalized = []
-    # ocr_raw is typically [ [ [box, (txt, conf)], ... ] ]
-    for block in ocr_raw:
-        for line in block:
-            box, (txt, conf) = line
-            normalized.append(
-                {
-                    "bbox": box,
-                    "text": txt,
-                    "confidence": float(conf),
-                }
+    # ocr_raw is typically [ [ [box, (txt, conf)], ... ] ]; a page with no
+    # text comes back as [None]
+    return [
+        {"bbox": box, "text": txt, "confidence": float(conf)}
+        for block in ocr_raw
+        if block
+        for box, (txt, conf) in block
+    ]
+
+
+def to_rgb_array(img: Image.Image) -> np.ndarray:
+    """
+    Expose a PIL image as an RGB ndarray. np.asarray wraps the buffer PIL
+    exports instead of copying it a second time like np.array does, and
+    images that are already RGB are not converted (convert always copies).
+    """
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+    return np.asarray(img)
+
+# ---------- PDF pipeline ----------
+# Pages flow renderer -> OCR worker -> request coroutine, so PyMuPDF
+# rasterises page N+1 while PaddleOCR is still busy with page N.
+_PIPELINE_DONE = object()
+
+
+def _render_pages(pdf_path: str, pages_q: queue.Queue, stop: threading.Event) -> None:
+    """Stage A: rasterise the PDF one page at a time."""
+    try:
+        with pymupdf.open(pdf_path) as doc:
+            for idx, page in enumerate(doc, start=1):
+                if stop.is_set():
+                    break
+                # Render straight to an RGB buffer; no image files or PIL decode
+                pix = page.get_pixmap(dpi=300, alpha=False)
+                img_np = np.frombuffer(pix.samples, dtype=np.uint8).reshape(
+                    pix.height, pix.width, pix.n
+                )
+                del pix
+                pages_q.put((idx, img_np))
+    finally:
+        pages_q.put(_PIPELINE_DONE)
+
+
+def _ocr_pages(pages_q: queue.Queue, results_q: queue.Queue, stop: threading.Event) -> None:
+    """Stage B: run PaddleOCR on each page as soon as it is rendered."""
+    item = None
+    try:
+        while True:
+            item = pages_q.get()
+            if item is _PIPELINE_DONE or stop.is_set():
+                break
+            idx, img_np = item
+            results_q.put((idx, run_ocr(img_np)))
+    except BaseException:
+        # Stop the renderer too; nothing it renders from here on gets used
+        stop.set()
+        raise
+    finally:
+        # On failure or stop keep draining so the renderer never blocks on a full queue
+        while item is not _PIPELINE_DONE:
+            item = pages_q.get()
+        results_q.put(_PIPELINE_DONE)
+
+
+async def ocr_pdf(upload: BinaryIO) -> List[dict]:
+    """
+    Stage C: collect and normalize per-page results in page order.
+    Errors raised by the renderer or OCR worker are re-raised here. If OCR
+    or collecting fails, or the request is cancelled, the other stages stop
+    at the next page and are left to wind down without blocking the event loop.
+    """
+    pages_q: queue.Queue = queue.Queue(maxsize=PIPELINE_DEPTH)
+    # Results are small; leaving this queue unbounded means the OCR worker
+    # can never deadlock against a collector that has stopped reading.
+    results_q: queue.Queue = queue.Queue()
+    pages_output = []
+
+    with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+        # Stream the upload to disk for PyMuPDF rather than reading it into memory
+        await run_in_threadpool(shutil.copyfileobj, upload, pdf_file)
+        pdf_file.flush()
+
+        stop = threading.Event()
+        pool = ThreadPoolExecutor(max_workers=2)
+        try:
+            renderer = asyncio.wrap_future(
+                pool.submit(_render_pages, pdf_file.name, pages_q, stop)
             )
-    return normalized
+            worker = asyncio.wrap_future(pool.submit(_ocr_pages, pages_q, results_q, stop))
+            try:
+                while True:
+                    item = await run_in_threadpool(results_q.get)
+                    if item is _PIPELINE_DONE:
+                        break
+                    idx, raw = item
+                    pages_output.append(
+                        {
+                            "page": idx,
+                            "results": normalize_result(raw),
+                        }
+                    )
+            finally:
+                # Tell the stages to stop early; harmless once they are done
+                stop.set()
+            await renderer
+            await worker
+        finally:
+            # shutdown(wait=True) would block the event loop until the stages exit
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    return pages_output
+
+
+def decode_image(content: bytes) -> np.ndarray:
+    """
+    Decode image bytes to an RGB ndarray. OpenCV decodes straight into a
+    BGR array, and reversing the channel axis is a view rather than a copy.
+    PIL is only used for formats OpenCV cannot read.
+    """
+    img_np = cv2.imdecode(np.frombuffer(content, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img_np is None:
+        return to_rgb_array(Image.open(io.BytesIO(content)))
+    return img_np[:, :, ::-1]
+
+
+def ocr_image(upload: BinaryIO) -> List[dict]:
+    """Decode and OCR a single image upload; blocking, run it in the threadpool."""
+    img_np = decode_image(upload.read())
+    return [
+        {
+            "page": 1,
+            "results": normalize_result(run_ocr(img_np)),
+        }
+    ]
 
 # ---------- Endpoints ----------
 
@@ -81,37 +259,18 @@ async def ocr_endpoint(file: UploadFile = File(...)):
       ]
     }
     """
-    content = await file.read()
     filename = file.filename or "document"
     content_type = file.content_type or ""
 
-    pages_output = []
-
     is_pdf = filename.lower().endswith(".pdf") or content_type == "application/pdf"
 
+    # Blocking work runs off the event loop so concurrent requests overlap
     if is_pdf:
-        # Convert each PDF page to PIL Image
-        images = convert_from_bytes(content, dpi=300)
-        for idx, img in enumerate(images, start=1):
-            img_np = np.array(img.convert("RGB"))
-            raw = ocr_engine.ocr(img_np, cls=True)
-            pages_output.append(
-                {
-                    "page": idx,
-                    "results": normalize_result(raw),
-                }
-            )
+        # Render and OCR pages concurrently
+        pages_output = await ocr_pdf(file.file)
     else:
         # Assume it's a single image
-        img = Image.open(io.BytesIO(content)).convert("RGB")
-        img_np = np.array(img)
-        raw = ocr_engine.ocr(img_np, cls=True)
-        pages_output.append(
-            {
-                "page": 1,
-                "results": normalize_result(raw),
-            }
-        )
+        pages_output = await run_in_threadpool(ocr_image, file.file)
 
     return {
         "filename": filename,
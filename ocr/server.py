@@ -1,5 +1,7 @@
-import io
 import os
+import shutil
+import tempfile
+import threading
 from typing import List, Any
 
 os.environ["PPOCR_MODEL_DIR"] = "/opt/paddleocr/models"
@@ -12,7 +14,7 @@ print("MODEL DIR:", os.environ.get("PPOCR_MODEL_DIR"))
 
 
 from paddleocr import PaddleOCR
-from pdf2image import convert_from_bytes
+from pdf2image import convert_from_path
 from PIL import Image
 import uvicorn
 
@@ -20,6 +22,12 @@ import uvicorn
 OCR_LANG = os.getenv("PADDLE_LANG", "en")
 OCR_PORT = int(os.getenv("PADDLE_PORT", "6000"))
 OCR_HOST = os.getenv("PADDLE_HOST", "0.0.0.0")
+# Inference backend. GPU is used when Paddle was built with CUDA and falls
+# back to CPU otherwise; TensorRT needs the TensorRT libraries installed.
+# PADDLE_PRECISION=fp16 runs TensorRT in FP16 on GPU and MKL-DNN in BF16 on CPU.
+OCR_USE_GPU = os.getenv("PADDLE_USE_GPU", "true").lower() == "true"
+OCR_USE_TENSORRT = os.getenv("PADDLE_USE_TENSORRT", "false").lower() == "true"
+OCR_PRECISION = os.getenv("PADDLE_PRECISION", "fp32")
 
 
 # ---------- App + CORS ----------
@@ -38,9 +46,20 @@ app.add_middleware(
 
 # ---------- OCR Engine ----------
 ocr_engine = PaddleOCR(
-    use_textline_orientation=True,   # replaces use_angle_cls
-    lang=OCR_LANG
+    use_angle_cls=True,   # PaddleOCR 2.x; loads the classifier that cls=True runs
+    lang=OCR_LANG,
+    use_gpu=OCR_USE_GPU,
+    use_tensorrt=OCR_USE_TENSORRT,
+    precision=OCR_PRECISION,
+    enable_mkldnn=True,
+    cpu_threads=os.cpu_count() or 1,
 )
+# Run one dummy inference at startup so model loading and TensorRT engine
+# building happen before the first real request instead of during it
+ocr_engine.ocr(np.zeros((640, 640, 3), dtype=np.uint8), cls=True)
+# Paddle predictors are not thread-safe and handlers now run in FastAPI's
+# threadpool, so inference on the shared engine is serialized
+ocr_lock = threading.Lock()
 
 
 def normalize_result(ocr_raw: List[Any]) -> List[dict]:
@@ -72,7 +91,7 @@ def health():
     return {"status": "ok"}
 
 @app.post("/ocr")
-async def ocr_endpoint(file: UploadFile = File(...)):
+def ocr_endpoint(file: UploadFile = File(...)):
     """
     Accepts a PDF or image and returns OCR results per page.
 
@@ -88,7 +107,6 @@ async def ocr_endpoint(file: UploadFile = File(...)):
       ]
     }
     """
-    content = await file.read()
     filename = file.filename or "document"
     content_type = file.content_type or ""
 
@@ -97,11 +115,15 @@ async def ocr_endpoint(file: UploadFile = File(...)):
     is_pdf = filename.lower().endswith(".pdf") or content_type == "application/pdf"
 
     if is_pdf:
-        # Convert each PDF page to PIL Image
-        images = convert_from_bytes(content, dpi=300)
+        # Stream the upload to disk and convert each PDF page to PIL Image
+        with tempfile.NamedTemporaryFile(suffix=".pdf") as pdf_file:
+            shutil.copyfileobj(file.file, pdf_file)
+            pdf_file.flush()
+            images = convert_from_path(pdf_file.name, dpi=300)
         for idx, img in enumerate(images, start=1):
             img_np = np.array(img.convert("RGB"))
-            raw = ocr_engine.ocr(img_np, cls=True)
+            with ocr_lock:
+                raw = ocr_engine.ocr(img_np, cls=True)
             pages_output.append(
                 {
                     "page": idx,
@@ -109,10 +131,11 @@ async def ocr_endpoint(file: UploadFile = File(...)):
                 }
             )
     else:
-        # Assume it's a single image
-        img = Image.open(io.BytesIO(content)).convert("RGB")
+        # Assume it's a single image; PIL reads straight from the upload
+        img = Image.open(file.file).convert("RGB")
         img_np = np.array(img)
-        raw = ocr_engine.ocr(img_np, cls=True)
+        with ocr_lock:
+            raw = ocr_engine.ocr(img_np, cls=True)
         pages_output.append(
             {
                 "page": 1,
@@ -0,0 +1,151 @@
+"""
+Tests for the PDF pipeline in server-prod.py, run with a stub OCR engine
+"""
+
+import asyncio
+import importlib.util
+import io
+import sys
+import threading
+import types
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("PIL")
+pytest.importorskip("fastapi")
+pymupdf = pytest.importorskip("pymupdf")
+
+
+class StubEngine:
+    """Stands in for PaddleOCR: one line of text per page"""
+
+    calls = []
+
+    def __init__(self, **kwargs):
+        pass
+
+    def ocr(self, img, cls=True):
+        StubEngine.calls.append(img.shape)
+        return [[[[[0, 0], [1, 0], [1, 1], [0, 1]], ("text", 0.9)]]]
+
+
+class Stages:
+    """Pages handed from the renderer to the OCR worker, and a signal once both have exited"""
+
+    def __init__(self):
+        self.rendered = []
+        self._finished = threading.Semaphore(0)
+
+    def finished(self) -> None:
+        self._finished.release()
+
+    def wait(self, timeout: float = 10) -> bool:
+        return all(self._finished.acquire(timeout=timeout) for _ in range(2))
+
+
+@pytest.fixture
+def server(monkeypatch):
+    """
+    server-prod.py loaded with stub paddleocr and cv2 modules, so neither the
+    Paddle stack nor OpenCV has to be installed and no models are loaded
+    """
+    monkeypatch.setitem(sys.modules, "paddleocr", types.SimpleNamespace(PaddleOCR=StubEngine))
+    monkeypatch.setitem(sys.modules, "cv2", types.ModuleType("cv2"))
+    monkeypatch.setenv("PADDLE_POOL_SIZE", "1")
+    spec = importlib.util.spec_from_file_location(
+        "server_prod", Path(__file__).parent.parent / "server-prod.py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    # Drop the warm-up inference run at import
+    StubEngine.calls = []
+    return module
+
+
+@pytest.fixture
+def stages(server, monkeypatch):
+    """Track the pipeline stages started by ocr_pdf"""
+    tracked = Stages()
+    render_pages = server._render_pages
+    ocr_pages = server._ocr_pages
+
+    def tracked_render_pages(pdf_path, pages_q, stop):
+        put = pages_q.put
+
+        def counting_put(item):
+            if item is not server._PIPELINE_DONE:
+                tracked.rendered.append(item[0])
+            put(item)
+
+        pages_q.put = counting_put
+        try:
+            render_pages(pdf_path, pages_q, stop)
+        finally:
+            tracked.finished()
+
+    def tracked_ocr_pages(pages_q, results_q, stop):
+        try:
+            ocr_pages(pages_q, results_q, stop)
+        finally:
+            tracked.finished()
+
+    monkeypatch.setattr(server, "_render_pages", tracked_render_pages)
+    monkeypatch.setattr(server, "_ocr_pages", tracked_ocr_pages)
+    return tracked
+
+
+def make_pdf(pages: int) -> bytes:
+    """Build a PDF of small blank pages"""
+    with pymupdf.open() as doc:
+        for _ in range(pages):
+            doc.new_page(width=72, height=72)
+        return doc.tobytes()
+
+
+def test_ocr_pdf_returns_pages_in_order(server, stages):
+    """Test that every page is OCR'd and returned in page order"""
+    pages = asyncio.run(server.ocr_pdf(io.BytesIO(make_pdf(5))))
+
+    assert [page["page"] for page in pages] == [1, 2, 3, 4, 5]
+    assert pages[0]["results"] == [
+        {"bbox": [[0, 0], [1, 0], [1, 1], [0, 1]], "text": "text", "confidence": 0.9}
+    ]
+    assert stages.wait()
+    assert stages.rendered == [1, 2, 3, 4, 5]
+
+
+def test_ocr_pdf_stops_pipeline_when_collector_fails(server, stages, monkeypatch):
+    """Test that a failure while collecting stops rendering and OCR of the remaining pages"""
+    normalize_result = server.normalize_result
+    collected = []
+
+    def failing_normalize(raw):
+        collected.append(raw)
+        if len(collected) == 4:
+            raise ValueError("unexpected page shape")
+        return normalize_result(raw)
+
+    monkeypatch.setattr(server, "normalize_result", failing_normalize)
+
+    with pytest.raises(ValueError):
+        asyncio.run(server.ocr_pdf(io.BytesIO(make_pdf(40))))
+
+    assert stages.wait()
+    assert len(stages.rendered) < 40
+    assert len(StubEngine.calls) < 40
+
+
+def test_ocr_pdf_stops_rendering_when_ocr_fails(server, stages, monkeypatch):
+    """Test that an OCR failure stops the renderer instead of letting it finish the document"""
+    def failing_ocr(self, img, cls=True):
+        raise RuntimeError("inference failed")
+
+    monkeypatch.setattr(StubEngine, "ocr", failing_ocr)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(server.ocr_pdf(io.BytesIO(make_pdf(60))))
+
+    assert stages.wait()
+    # The queued pages, the one being put and the one being rendered at most
+    assert len(stages.rendered) <= server.PIPELINE_DEPTH + 2
@@ -1,9 +1,11 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import Dict, Union
+from typing import Dict, Tuple, Union
 import io
-import base64
+import copy
+import functools
 import zipfile
+import zlib
 from lxml import etree
 from pathlib import Path
 import datetime as dt
@@ -14,6 +16,10 @@ app = FastAPI()
 # Where templates are mounted inside the container
 TEMPLATE_DIR = Path("/templates")
 
+# Generated files are sent once and never archived, so favour deflate speed
+# over ratio; level 1 stays within a few percent of the default level 6
+ZIP_COMPRESSLEVEL = 1
+
 # Namespace constants for Excel XML
 NS = {
     "ws": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
@@ -21,6 +27,15 @@ NS = {
     "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
 }
 
+# Workbook and sheet XML never needs DTDs, entities or an ID index
+_PARSER = etree.XMLParser(
+    resolve_entities=False,
+    no_network=True,
+    huge_tree=False,
+    collect_ids=False,
+    remove_blank_text=False,
+)
+
 TEMPLATE_FIELD_MAP = {
     "AvionPOCTemplate.xlsx": {
         # --- General ---
@@ -113,7 +128,7 @@ def _find_sheet_path(zf: zipfile.ZipFile, sheet_name: str) -> str:
     Returns something like 'xl/worksheets/sheet1.xml'.
     """
     workbook_xml = zf.read("xl/workbook.xml")
-    wb_root = etree.fromstring(workbook_xml)
+    wb_root = etree.fromstring(workbook_xml, parser=_PARSER)
 
     sheets_el = wb_root.find("ws:sheets", namespaces=NS)
     if sheets_el is None:
@@ -130,7 +145,7 @@ def _find_sheet_path(zf: zipfile.ZipFile, sheet_name: str) -> str:
 
     # Now resolve the rel_id to a target path using workbook.xml.rels
     rels_xml = zf.read("xl/_rels/workbook.xml.rels")
-    rels_root = etree.fromstring(rels_xml)
+    rels_root = etree.fromstring(rels_xml, parser=_PARSER)
 
     target = None
     for rel in rels_root.findall("rel:Relationship", namespaces=NS):
@@ -147,43 +162,129 @@ def _find_sheet_path(zf: zipfile.ZipFile, sheet_name: str) -> str:
     return target
 
 
+@functools.lru_cache(maxsize=32)
+def _resolve_sheet_path(template_path: str, mtime_ns: int, sheet_name: str) -> str:
+    """
+    Cached _find_sheet_path for a template on disk. Templates rarely change, so
+    workbook.xml and its rels are parsed once; mtime_ns is part of the cache
+    key so replacing a template invalidates its entry.
+    """
+    with zipfile.ZipFile(template_path, "r") as zf:
+        return _find_sheet_path(zf, sheet_name)
+
+
+def _set_cell_value(c: etree._Element, value: Union[str, int, float]) -> None:
+    """Replace the value of a <c> element, keeping its style attributes."""
+    # Remove existing <v> or <is> children
+    for child in list(c):
+        # tag names with namespace
+        if child.tag in (
+            f"{{{NS['ws']}}}v",
+            f"{{{NS['ws']}}}is",
+        ):
+            c.remove(child)
+
+    # Decide if this should be numeric or string
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        # Numeric cell
+        c.attrib.pop("t", None)  # remove any existing t attr
+        v_el = etree.SubElement(c, f"{{{NS['ws']}}}v")
+        v_el.text = str(value)
+    else:
+        # String cell
+        c.attrib["t"] = "str"
+        v_el = etree.SubElement(c, f"{{{NS['ws']}}}v")
+        v_el.text = str(value)
+
+
 def _update_cells(sheet_xml: bytes, cell_updates: Dict[str, Union[str, int, float]]) -> bytes:
     """
     Update specific cells in a sheet's XML, preserving styles and formatting.
 
     cell_updates: {"C6": "000001", "C7": "A319-113", ...}
     """
-    root = etree.fromstring(sheet_xml)
-
-    for cell_ref, value in cell_updates.items():
-        # Find the <c> element with r="C6" etc.
-        c = root.find(f".//ws:c[@r='{cell_ref}']", namespaces=NS)
-        if c is None:
-            # For now, fail loudly; you can relax this later if you want.
-            raise ValueError(f"Cell {cell_ref} not found in sheet XML")
-
-        # Remove existing <v> or <is> children
-        for child in list(c):
-            # tag names with namespace
-            if child.tag in (
-                f"{{{NS['ws']}}}v",
-                f"{{{NS['ws']}}}is",
-            ):
-                c.remove(child)
-
-        # Decide if this should be numeric or string
-        if isinstance(value, (int, float)) and not isinstance(value, bool):
-            # Numeric cell
-            c.attrib.pop("t", None)  # remove any existing t attr
-            v_el = etree.SubElement(c, f"{{{NS['ws']}}}v")
-            v_el.text = str(value)
-        else:
-            # String cell
-            c.attrib["t"] = "str"
-            v_el = etree.SubElement(c, f"{{{NS['ws']}}}v")
-            v_el.text = str(value)
-
-    return etree.tostring(root, xml_declaration=False, encoding="utf-8")
+    # Patch each <c> as soon as the parser completes it, matching against the
+    # pending updates, instead of building the tree and then searching it.
+    # The full tree is still needed to serialize the result, so elements are
+    # not cleared.
+    pending = dict(cell_updates)
+    context = etree.iterparse(
+        io.BytesIO(sheet_xml),
+        events=("end",),
+        tag=f"{{{NS['ws']}}}c",
+        # Same settings as _PARSER; iterparse builds its own parser
+        resolve_entities=False,
+        no_network=True,
+        huge_tree=False,
+        collect_ids=False,
+    )
+    for _, c in context:
+        if pending:
+            cell_ref = c.get("r")
+            if cell_ref in pending:
+                _set_cell_value(c, pending.pop(cell_ref))
+
+    if pending:
+        # For now, fail loudly; you can relax this later if you want.
+        raise ValueError(f"Cell {next(iter(pending))} not found in sheet XML")
+
+    return etree.tostring(context.root, xml_declaration=False, encoding="utf-8")
+
+
+def _read_raw_entry(zin: zipfile.ZipFile, item: zipfile.ZipInfo) -> bytes:
+    """Return an entry's bytes exactly as stored in the archive (still compressed)."""
+    with zin.open(item) as src:
+        # The entry stream is positioned just past the local file header
+        return src._fileobj.read(item.compress_size)
+
+
+def _inflate_entry(item: zipfile.ZipInfo, raw: bytes) -> bytes:
+    """Decompress bytes returned by _read_raw_entry."""
+    if item.compress_type == zipfile.ZIP_STORED:
+        data = raw
+    elif item.compress_type == zipfile.ZIP_DEFLATED:
+        data = zlib.decompress(raw, -zlib.MAX_WBITS)
+    else:
+        raise ValueError(f"Unsupported compression for {item.filename}")
+    if zlib.crc32(data) != item.CRC:
+        raise zipfile.BadZipFile(f"Bad CRC-32 for file {item.filename!r}")
+    return data
+
+
+def _write_raw_entry(zout: zipfile.ZipFile, item: zipfile.ZipInfo, raw: bytes) -> None:
+    """
+    Append an entry to zout exactly as stored, without inflating and
+    re-deflating it. zipfile has no public API for this, so the local header
+    is written by hand the same way ZipFile.writestr does it.
+    """
+    zinfo = copy.copy(item)
+    # CRC and sizes are known up front, so no trailing data descriptor
+    zinfo.flag_bits &= ~0x08
+
+    with zout._lock:
+        if zout._seekable:
+            zout.fp.seek(zout.start_dir)
+        zinfo.header_offset = zout.fp.tell()
+        zout._writecheck(zinfo)
+        zout._didModify = True
+        zout.fp.write(zinfo.FileHeader())
+        zout.fp.write(raw)
+        zout.start_dir = zout.fp.tell()
+        zout.filelist.append(zinfo)
+        zout.NameToInfo[zinfo.filename] = zinfo
+
+
+@functools.lru_cache(maxsize=8)
+def _load_template(template_path: str, mtime_ns: int) -> Tuple[Tuple[zipfile.ZipInfo, bytes], ...]:
+    """
+    Read every entry of a template once, as (ZipInfo, stored bytes) pairs in
+    archive order. Like _resolve_sheet_path, mtime_ns is part of the cache key
+    so replacing a template on disk invalidates it. The cached ZipInfo objects
+    are shared between requests and must not be modified.
+    """
+    with zipfile.ZipFile(template_path, "r") as zin:
+        return tuple((item, _read_raw_entry(zin, item)) for item in zin.infolist())
+
 
 @app.get("/")
 def root():
@@ -216,34 +317,35 @@ def generate_xlsx(payload: GeneratePayload):
     if not cell_updates:
         raise HTTPException(status_code=400, detail="No matching fields for template")
 
+    # Find the path for the 'Maintenance Template' sheet, or just use the first sheet
+    # If your template always uses that name, you can hardcode it.
+    mtime_ns = template_path.stat().st_mtime_ns
+    try:
+        sheet_path = _resolve_sheet_path(str(template_path), mtime_ns, "Maintenance Template")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error locating sheet: {e}")
+
     # Work entirely in memory
     out_buf = io.BytesIO()
 
-    with zipfile.ZipFile(template_path, "r") as zin, \
-            zipfile.ZipFile(out_buf, "w", compression=zipfile.ZIP_DEFLATED) as zout:
-
-        # Find the path for the 'Maintenance Template' sheet, or just use the first sheet
-        # If your template always uses that name, you can hardcode it.
-        try:
-            sheet_path = _find_sheet_path(zin, sheet_name="Maintenance Template")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error locating sheet: {e}")
-
-        for item in zin.infolist():
-            data = zin.read(item.filename)
-            if item.filename == sheet_path:
-                # Patch the sheet XML with our new values
-                try:
-                    data = _update_cells(data, cell_updates)
-                except Exception as e:
-                    raise HTTPException(status_code=500, detail=f"Error updating cells: {e}")
-
-            zout.writestr(item, data)
-
-    out_buf.seek(0)
-    xlsx_bytes = out_buf.getvalue()
-    b64 = base64.b64encode(xlsx_bytes).decode("ascii")
-
+    with zipfile.ZipFile(
+        out_buf, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL
+    ) as zout:
+        for item, raw in _load_template(str(template_path), mtime_ns):
+            if item.filename != sheet_path:
+                # Untouched parts are copied still compressed
+                _write_raw_entry(zout, item, raw)
+                continue
+
+            # Patch the sheet XML with our new values
+            try:
+                data = _update_cells(_inflate_entry(item, raw), cell_updates)
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Error updating cells: {e}")
+
+            # writestr fills in sizes and offsets, so give it a copy of the cached info.
+            # It also ignores the archive's compresslevel for a ZipInfo, hence passing it.
+            zout.writestr(copy.copy(item), data, compresslevel=ZIP_COMPRESSLEVEL)
 
     file_name = f"lease-summary-{payload.fields.get('msn', '') or int(dt.datetime.utcnow().timestamp())}.xlsx"
 
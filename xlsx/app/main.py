@@ -4,11 +4,13 @@ FastAPI application for XLSX generation service
 
 import base64
 import datetime as dt
+import logging
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Dict, Optional
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
-import io
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import Response
 
 from app.models import (
     GenerateXLSXRequest,
@@ -20,11 +22,7 @@ from app.models import (
 from app.xlsx_generator import XLSXGenerator
 from app import __version__
 
-app = FastAPI(
-    title="XLSX Generation Service",
-    description="Generate Excel files by directly manipulating XML structure of templates",
-    version=__version__,
-)
+logger = logging.getLogger(__name__)
 
 # Template directory (mounted as volume in Docker)
 TEMPLATE_DIR = Path("/templates")
@@ -44,6 +42,36 @@ TEMPLATE_CONFIG: Dict[str, Dict] = {
 }
 
 
+def preload_templates() -> None:
+    """
+    Load every configured template into the generator's cache so the first
+    request for it does not pay for reading and decompressing the archive
+    """
+    for template_name, config in TEMPLATE_CONFIG.items():
+        template_path = TEMPLATE_DIR / template_name
+        if not template_path.exists():
+            continue
+        try:
+            XLSXGenerator(template_path).preload(config.get("sheet_name"))
+        except Exception as e:
+            # A broken template fails its own requests, not the whole service
+            logger.warning("Could not preload template %s: %s", template_name, e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    preload_templates()
+    yield
+
+
+app = FastAPI(
+    title="XLSX Generation Service",
+    description="Generate Excel files by directly manipulating XML structure of templates",
+    version=__version__,
+    lifespan=lifespan,
+)
+
+
 @app.get("/health", response_model=HealthResponse)
 async def health_check():
     """
@@ -96,13 +124,13 @@ async def generate_xlsx(request: GenerateXLSXRequest):
         request: Contains template_name, data (cell mappings), return_format, and optional sheet_name
 
     Returns:
-        GenerateXLSXResponse with base64 data or file download
+        XLSX file download, or GenerateXLSXResponse with base64 data if requested
 
     Example request body:
     {
         "template_name": "Template.xlsx",
         "data": {"B3": "MSN12345", "C4": "ABC Airlines"},
-        "return_format": "base64"
+        "return_format": "file"
     }
     """
     template_path = TEMPLATE_DIR / request.template_name
@@ -138,10 +166,11 @@ async def generate_xlsx(request: GenerateXLSXRequest):
             detail="No valid cell updates provided. Use field names or cell references.",
         )
 
-    # Generate XLSX
+    # Generate XLSX in the threadpool: it is CPU-bound, and running it on the
+    # event loop would stall every other request until it finished
     try:
         generator = XLSXGenerator(template_path)
-        xlsx_bytes = generator.generate(cell_updates, sheet_name)
+        xlsx_bytes = await run_in_threadpool(generator.generate, cell_updates, sheet_name)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -153,15 +182,8 @@ async def generate_xlsx(request: GenerateXLSXRequest):
     file_name = f"generated-{request.template_name.replace('.xlsx', '')}-{int(dt.datetime.utcnow().timestamp())}.xlsx"
 
     # Return based on format
-    if request.return_format == "file":
-        # Return as downloadable file
-        return StreamingResponse(
-            io.BytesIO(xlsx_bytes),
-            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-            headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
-        )
-    else:
-        # Return as base64
+    if request.return_format == "base64":
+        # Base64 in JSON only when asked for: it adds an encoding pass and a third to the payload
         b64_data = base64.b64encode(xlsx_bytes).decode("ascii")
         return GenerateXLSXResponse(
             success=True,
@@ -169,6 +191,14 @@ async def generate_xlsx(request: GenerateXLSXRequest):
             file_name=file_name,
             data=b64_data,
         )
+    else:
+        # Return as downloadable file; Response sends the bytes as-is, without
+        # wrapping them in another buffer and streaming it back line by line
+        return Response(
+            content=xlsx_bytes,
+            media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            headers={"Content-Disposition": f'attachment; filename="{file_name}"'},
+        )
 
 
 @app.get("/")
@@ -3,7 +3,7 @@ Pydantic models for API request/response validation
 """
 
 from pydantic import BaseModel, Field
-from typing import Dict, Union, Optional, List
+from typing import Dict, Literal, Union, Optional, List
 
 
 class GenerateXLSXRequest(BaseModel):
@@ -13,9 +13,9 @@ class GenerateXLSXRequest(BaseModel):
         ...,
         description="Dictionary of cell mappings (e.g., {'B3': 'value', 'C4': 123})"
     )
-    return_format: str = Field(
-        default="base64",
-        description="Return format: 'base64' or 'file'"
+    return_format: Literal["file", "base64"] = Field(
+        default="file",
+        description="Return format: 'file' (XLSX bytes) or 'base64' (JSON)"
     )
     sheet_name: Optional[str] = Field(
         default=None,
@@ -31,7 +31,7 @@ class GenerateXLSXRequest(BaseModel):
                     "B4": "ABC Airlines",
                     "C10": 1500000.00
                 },
-                "return_format": "base64"
+                "return_format": "file"
             }
         }
 
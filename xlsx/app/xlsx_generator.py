@@ -3,12 +3,22 @@ Core XLSX XML manipulation logic
 Preserves 100% of formatting by only modifying cell values
 """
 
+import copy
 import io
 import zipfile
-from typing import Dict, Union, Optional
+from functools import lru_cache
+from operator import itemgetter
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple, Union, Optional
+from xml.parsers import expat
 from lxml import etree
 from pathlib import Path
 
+try:
+    # ISA-L's SIMD deflate is about twice as fast as zlib; it is optional
+    from isal import isal_zlib as _zlib
+except ImportError:
+    import zlib as _zlib
+
 
 # XML Namespace constants for Excel
 NS = {
@@ -17,6 +27,284 @@ NS = {
     "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
 }
 
+# Clark-notation names for the elements touched per cell or per string,
+# built once instead of formatted on every use
+WS_SHEET_DATA = f"{{{NS['ws']}}}sheetData"
+WS_ROW = f"{{{NS['ws']}}}row"
+WS_C = f"{{{NS['ws']}}}c"
+WS_V = f"{{{NS['ws']}}}v"
+WS_F = f"{{{NS['ws']}}}f"
+WS_IS = f"{{{NS['ws']}}}is"
+WS_SST = f"{{{NS['ws']}}}sst"
+WS_SI = f"{{{NS['ws']}}}si"
+WS_T = f"{{{NS['ws']}}}t"
+
+# Shared strings lookups, compiled once. smart_strings=False returns plain str
+# results instead of ones that keep a reference back to their element
+XPATH_SI_TEXT = etree.XPath("./ws:t/text()", namespaces=NS, smart_strings=False)
+XPATH_RUN_TEXT = etree.XPath("./ws:r/ws:t/text()", namespaces=NS, smart_strings=False)
+
+# XML whitespace; strings starting or ending with one need xml:space="preserve"
+_WS_BOUNDS = (" ", "\t", "\n", "\r")
+
+# Generated files are sent once and never archived, so favour deflate speed
+# over ratio; level 1 stays within a few percent of the default level
+ZIP_COMPRESSLEVEL = 1
+
+# Buffer for unbuffered output streams, which would otherwise get one write
+# per zip header and part
+WRITE_BUFFER_SIZE = 256 * 1024
+
+# Template parts as stored in the archive: part name -> (ZipInfo, compressed
+# bytes), in archive order
+TemplateParts = Dict[str, Tuple[zipfile.ZipInfo, bytes]]
+
+
+def _parse_cell_ref(cell_ref: str) -> Tuple[int, int]:
+    """
+    Split a cell reference into (column number, row number), e.g. 'AB12' -> (28, 12)
+
+    A plain character loop; references are a few characters long, so this is
+    cheaper than going through the regex engine.
+    """
+    col = 0
+    i = 0
+    for ch in cell_ref:
+        if not "A" <= ch <= "Z":
+            break
+        col = col * 26 + ord(ch) - 64
+        i += 1
+    row = cell_ref[i:]
+    if not i or not row.isascii() or not row.isdigit():
+        raise ValueError(f"Invalid cell reference: {cell_ref}")
+    return col, int(row)
+
+
+def _iter_cells(row: etree._Element) -> Iterator[Tuple[etree._Element, int]]:
+    """
+    Yield (cell, column number) for each cell in a row
+
+    The r attribute is optional: a cell without one (or with one that cannot
+    be parsed) sits in the column after the previous cell.
+    """
+    col = 0
+    for cell in row.iterchildren(WS_C):
+        try:
+            col = _parse_cell_ref(cell.get("r", ""))[0]
+        except ValueError:
+            col += 1
+        yield cell, col
+
+
+def _deflate_chunks(data: bytes) -> Iterator[bytes]:
+    """
+    Compress data as a raw deflate stream, the form stored in a zip entry,
+    feeding it to the compressor WRITE_BUFFER_SIZE bytes at a time
+    """
+    compressor = _zlib.compressobj(ZIP_COMPRESSLEVEL, _zlib.DEFLATED, -_zlib.MAX_WBITS)
+    view = memoryview(data)
+    for start in range(0, len(view), WRITE_BUFFER_SIZE):
+        yield compressor.compress(view[start:start + WRITE_BUFFER_SIZE])
+    yield compressor.flush()
+
+
+def _zip_writestr(zout: zipfile.ZipFile, item: zipfile.ZipInfo, data: bytes) -> None:
+    """
+    Append an entry to zout, deflating it with _zlib instead of the stdlib
+    zlib that ZipFile.writestr is tied to
+
+    On a seekable archive the compressed chunks are written as they are
+    produced and the header is patched with the final size afterwards, so the
+    compressed entry is never held in memory as a whole.
+    """
+    zinfo = copy.copy(item)
+    zinfo.file_size = len(data)
+    zinfo.CRC = _zlib.crc32(data)
+    if zinfo.compress_type == zipfile.ZIP_STORED:
+        zinfo.compress_size = len(data)
+        _zip_write_chunks(zout, zinfo, (data,))
+        return
+
+    zinfo.compress_type = zipfile.ZIP_DEFLATED
+    if zout._seekable:
+        # Size unknown until compression finishes; _zip_write_chunks patches it
+        zinfo.compress_size = 0
+        _zip_write_chunks(zout, zinfo, _deflate_chunks(data))
+    else:
+        raw = b"".join(_deflate_chunks(data))
+        zinfo.compress_size = len(raw)
+        _zip_write_chunks(zout, zinfo, (raw,))
+
+
+def _zip_write_raw(zout: zipfile.ZipFile, item: zipfile.ZipInfo, raw: bytes) -> None:
+    """
+    Append an entry to zout exactly as stored, without inflating and
+    re-deflating it
+
+    item must already describe raw (compression, CRC and sizes).
+    """
+    _zip_write_chunks(zout, item, (raw,))
+
+
+def _zip_write_chunks(zout: zipfile.ZipFile, item: zipfile.ZipInfo, chunks: Iterable[bytes]) -> None:
+    """
+    Append an entry to zout from its stored bytes, given in chunks
+
+    zipfile has no public API for writing pre-compressed data, so the local
+    header is written by hand the same way ZipFile.writestr does it. item must
+    have its CRC and file_size set. If the chunks add up to a different size
+    than item.compress_size, the header is rewritten once they are written,
+    which needs a seekable archive.
+    """
+    zinfo = copy.copy(item)
+    # CRC and sizes go in the header, so no trailing data descriptor
+    zinfo.flag_bits &= ~0x08
+    # Choose the header layout up front (as ZipFile.open does), so a patched
+    # header takes exactly the same space
+    zip64 = (
+        zinfo.file_size * 1.05 > zipfile.ZIP64_LIMIT
+        or zinfo.compress_size > zipfile.ZIP64_LIMIT
+    )
+
+    with zout._lock:
+        if zout._seekable:
+            zout.fp.seek(zout.start_dir)
+        zinfo.header_offset = zout.fp.tell()
+        zout._writecheck(zinfo)
+        zout._didModify = True
+        zout.fp.write(zinfo.FileHeader(zip64))
+        written = 0
+        for chunk in chunks:
+            zout.fp.write(chunk)
+            written += len(chunk)
+        if written != zinfo.compress_size:
+            zinfo.compress_size = written
+            end = zout.fp.tell()
+            zout.fp.seek(zinfo.header_offset)
+            zout.fp.write(zinfo.FileHeader(zip64))
+            zout.fp.seek(end)
+        zout.start_dir = zout.fp.tell()
+        zout.filelist.append(zinfo)
+        zout.NameToInfo[zinfo.filename] = zinfo
+
+
+def _read_part(parts: TemplateParts, name: str) -> bytes:
+    """Decompress one template part"""
+    item, raw = parts[name]
+    if item.compress_type == zipfile.ZIP_STORED:
+        data = raw
+    elif item.compress_type == zipfile.ZIP_DEFLATED:
+        data = _zlib.decompress(raw, -_zlib.MAX_WBITS)
+    else:
+        raise ValueError(f"Unsupported compression for {name}")
+    if _zlib.crc32(data) != item.CRC:
+        raise zipfile.BadZipFile(f"Bad CRC-32 for file {name!r}")
+    return data
+
+
+@lru_cache(maxsize=8)
+def _load_template(template_path: str, mtime_ns: int) -> TemplateParts:
+    """
+    Read every part of a template once, still compressed
+
+    Parts that are not modified are copied to the output as-is, so only the
+    ones that are read get decompressed (see _read_part). mtime_ns is only
+    used as part of the cache key, so replacing a template on disk
+    invalidates its entry. The returned parts are shared between calls and
+    must not be modified.
+    """
+    parts = {}
+    with zipfile.ZipFile(template_path, "r") as zin:
+        for item in zin.infolist():
+            with zin.open(item) as src:
+                # The entry stream is positioned just past the local file header
+                parts[item.filename] = (item, src._fileobj.read(item.compress_size))
+    return parts
+
+
+# Parsed workbook.xml and its relationships: (sheet name -> relationship ID,
+# in workbook order; relationship ID -> target)
+WorkbookIndex = Tuple[Dict[str, str], Dict[str, str]]
+
+
+def _scan_elements(xml_data: bytes, tags: set) -> List[Tuple[str, Dict[str, str]]]:
+    """
+    Return (tag, attributes) for every element in xml_data whose tag is in tags
+
+    Tags and namespaced attribute names are "uri}local" (note: no leading
+    "{"). Uses expat directly: only a few attributes are needed from these
+    small parts, so no element objects are built.
+    """
+    found = []
+
+    def start(name, attrs):
+        if name in tags:
+            found.append((name, attrs))
+
+    parser = expat.ParserCreate(namespace_separator="}")
+    parser.StartElementHandler = start
+    parser.Parse(xml_data, True)
+    return found
+
+
+@lru_cache(maxsize=8)
+def _load_workbook_index(template_path: str, mtime_ns: int) -> WorkbookIndex:
+    """
+    Parse a template's workbook.xml and workbook.xml.rels once
+
+    Keyed like _load_template, whose cached parts it reads.
+    """
+    parts = _load_template(template_path, mtime_ns)
+
+    sheets_tag = f"{NS['ws']}}}sheets"
+    sheet_tag = f"{NS['ws']}}}sheet"
+    elements = _scan_elements(_read_part(parts, "xl/workbook.xml"), {sheets_tag, sheet_tag})
+    if not any(tag == sheets_tag for tag, _ in elements):
+        raise ValueError("Unable to find <sheets> element in workbook.xml")
+
+    sheets = {}
+    rel_id_attr = f"{NS['r']}}}id"
+    for tag, attrs in elements:
+        if tag == sheet_tag:
+            # Keep the first sheet with a given name, which is what lookups by name return
+            sheets.setdefault(attrs.get("name"), attrs.get(rel_id_attr))
+
+    rels = {}
+    relationship_tag = f"{NS['rel']}}}Relationship"
+    rels_xml = _read_part(parts, "xl/_rels/workbook.xml.rels")
+    for _, attrs in _scan_elements(rels_xml, {relationship_tag}):
+        rels.setdefault(attrs.get("Id"), attrs.get("Target"))
+
+    return sheets, rels
+
+
+# Cell updates in hashable form: (cell ref, value type, value), sorted by ref.
+# The type keeps values such as 1, 1.0 and True apart, which compare equal
+UpdatesKey = Tuple[Tuple[str, type, Union[str, int, float]], ...]
+
+
+@lru_cache(maxsize=64)
+def _generate_cached(
+    template_path: str, mtime_ns: int, updates: UpdatesKey, sheet_name: Optional[str]
+) -> bytes:
+    """
+    Generate the archive for one set of updates once
+
+    Keyed like _load_template plus the updates, so a template rendered again
+    with the same data skips parsing and compression entirely. Output only
+    depends on the template and the updates (entry timestamps come from the
+    template), and the returned bytes are shared between callers.
+    """
+    out_buf = io.BytesIO()
+    XLSXGenerator(Path(template_path))._write_archive(
+        out_buf,
+        _load_template(template_path, mtime_ns),
+        _load_workbook_index(template_path, mtime_ns),
+        {cell_ref: value for cell_ref, _, value in updates},
+        sheet_name,
+    )
+    return out_buf.getvalue()
+
 
 class XLSXGenerator:
     """
@@ -34,6 +322,23 @@ class XLSXGenerator:
         if not template_path.exists():
             raise FileNotFoundError(f"Template not found: {template_path}")
 
+    def preload(self, sheet_name: Optional[str] = None) -> str:
+        """
+        Load the template into the cache ahead of the first request
+
+        Args:
+            sheet_name: Sheet name that will be modified (defaults to first sheet if None)
+
+        Returns:
+            Path of the target sheet inside the archive
+        """
+        template_key = (str(self.template_path), self.template_path.stat().st_mtime_ns)
+        _load_template(*template_key)
+        workbook = _load_workbook_index(*template_key)
+        if sheet_name:
+            return self._find_sheet_path_by_name(workbook, sheet_name)
+        return self._find_first_sheet_path(workbook)
+
     def generate(
         self,
         cell_updates: Dict[str, Union[str, int, float]],
@@ -52,142 +357,206 @@ class XLSXGenerator:
         if not cell_updates:
             raise ValueError("cell_updates cannot be empty")
 
+        try:
+            updates = tuple(sorted(
+                (cell_ref, type(value), value) for cell_ref, value in cell_updates.items()
+            ))
+            hash(updates)
+        except TypeError:
+            # Values the cache cannot key on; generate without it
+            updates = None
+        if updates is not None:
+            template_key = (str(self.template_path), self.template_path.stat().st_mtime_ns)
+            return _generate_cached(*template_key, updates, sheet_name)
+
         out_buf = io.BytesIO()
+        self.generate_to(out_buf, cell_updates, sheet_name)
+        # getvalue hands over BytesIO's own buffer rather than copying it
+        return out_buf.getvalue()
 
-        with zipfile.ZipFile(self.template_path, "r") as zin, \
-                zipfile.ZipFile(out_buf, "w", compression=zipfile.ZIP_DEFLATED) as zout:
+    def generate_to(
+        self,
+        fp: BinaryIO,
+        cell_updates: Dict[str, Union[str, int, float]],
+        sheet_name: Optional[str] = None
+    ) -> None:
+        """
+        Generate XLSX with updated cell values, writing it to a file object
+
+        Args:
+            fp: Writable binary file object; it does not need to be seekable.
+                On error it may be left holding a partial archive
+            cell_updates: Dictionary mapping cell references to values (e.g., {"B3": "value"})
+            sheet_name: Sheet name to modify (defaults to first sheet if None)
+        """
+        if not cell_updates:
+            raise ValueError("cell_updates cannot be empty")
+
+        template_key = (str(self.template_path), self.template_path.stat().st_mtime_ns)
+        parts = _load_template(*template_key)
+        workbook = _load_workbook_index(*template_key)
+
+        buffered = None
+        if isinstance(fp, io.RawIOBase):
+            fp = buffered = io.BufferedWriter(fp, buffer_size=WRITE_BUFFER_SIZE)
+        try:
+            self._write_archive(fp, parts, workbook, cell_updates, sheet_name)
+        finally:
+            if buffered is not None:
+                # Hand the raw stream back to the caller without closing it
+                buffered.flush()
+                buffered.detach()
+
+    def _write_archive(
+        self,
+        fp: BinaryIO,
+        parts: TemplateParts,
+        workbook: WorkbookIndex,
+        cell_updates: Dict[str, Union[str, int, float]],
+        sheet_name: Optional[str]
+    ) -> None:
+        """Write the generated archive to fp (see generate_to)"""
+        with zipfile.ZipFile(
+            fp, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL
+        ) as zout:
 
             # Find the target sheet path
             if sheet_name:
-                sheet_path = self._find_sheet_path_by_name(zin, sheet_name)
+                sheet_path = self._find_sheet_path_by_name(workbook, sheet_name)
             else:
-                sheet_path = self._find_first_sheet_path(zin)
+                sheet_path = self._find_first_sheet_path(workbook)
 
             # Process shared strings if they exist
-            shared_strings_updated = False
             shared_strings_xml = None
             string_table = []
-
-            if "xl/sharedStrings.xml" in zin.namelist():
-                shared_strings_xml = zin.read("xl/sharedStrings.xml")
-                string_table = self._parse_shared_strings(shared_strings_xml)
+            string_lookup = {}
+
+            if "xl/sharedStrings.xml" in parts:
+                shared_strings_xml = _read_part(parts, "xl/sharedStrings.xml")
+                string_table, string_lookup = self._parse_shared_strings(shared_strings_xml)
+
+            # Update the worksheet XML before copying anything, so the shared
+            # strings table is complete wherever it sits in the archive
+            original_strings = len(string_table)
+            sheet_xml = self._update_cells(
+                _read_part(parts, sheet_path),
+                cell_updates,
+                string_table,
+                use_shared_strings=bool(shared_strings_xml),
+                string_lookup=string_lookup
+            )
+            # Updates only ever append strings, so the table changed iff it grew
+            shared_strings_dirty = len(string_table) != original_strings
 
             # Copy all files, modifying only the target sheet
-            for item in zin.infolist():
-                data = zin.read(item.filename)
-
+            for item, raw in parts.values():
                 if item.filename == sheet_path:
-                    # Update the worksheet XML
-                    data = self._update_cells(
-                        data,
-                        cell_updates,
-                        string_table,
-                        use_shared_strings=bool(shared_strings_xml)
-                    )
-                elif item.filename == "xl/sharedStrings.xml" and string_table:
+                    data = sheet_xml
+                elif item.filename == "xl/sharedStrings.xml" and shared_strings_dirty:
                     # Update shared strings if modified
                     data = self._rebuild_shared_strings(string_table)
-                    shared_strings_updated = True
-
-                zout.writestr(item, data)
+                else:
+                    # Unchanged part: copy the compressed bytes verbatim
+                    _zip_write_raw(zout, item, raw)
+                    continue
 
-        out_buf.seek(0)
-        return out_buf.getvalue()
+                _zip_writestr(zout, item, data)
 
-    def _find_first_sheet_path(self, zf: zipfile.ZipFile) -> str:
+    def _find_first_sheet_path(self, workbook: WorkbookIndex) -> str:
         """Find the path to the first worksheet"""
-        workbook_xml = zf.read("xl/workbook.xml")
-        wb_root = etree.fromstring(workbook_xml)
-
-        sheets_el = wb_root.find("ws:sheets", namespaces=NS)
-        if sheets_el is None:
-            raise ValueError("Unable to find <sheets> element in workbook.xml")
-
-        first_sheet = sheets_el.find("ws:sheet", namespaces=NS)
-        if first_sheet is None:
+        sheets, _ = workbook
+        if not sheets:
             raise ValueError("No sheets found in workbook")
 
-        rel_id = first_sheet.get(f"{{{NS['r']}}}id")
-        return self._resolve_relationship(zf, rel_id)
+        rel_id = next(iter(sheets.values()))
+        return self._resolve_relationship(workbook, rel_id)
 
-    def _find_sheet_path_by_name(self, zf: zipfile.ZipFile, sheet_name: str) -> str:
+    def _find_sheet_path_by_name(self, workbook: WorkbookIndex, sheet_name: str) -> str:
         """Find the path to a worksheet by name"""
-        workbook_xml = zf.read("xl/workbook.xml")
-        wb_root = etree.fromstring(workbook_xml)
+        sheets, _ = workbook
+        if sheet_name not in sheets:
+            raise ValueError(f"Sheet named '{sheet_name}' not found")
 
-        sheets_el = wb_root.find("ws:sheets", namespaces=NS)
-        if sheets_el is None:
-            raise ValueError("Unable to find <sheets> element in workbook.xml")
+        return self._resolve_relationship(workbook, sheets[sheet_name])
 
-        for sheet in sheets_el.findall("ws:sheet", namespaces=NS):
-            if sheet.get("name") == sheet_name:
-                rel_id = sheet.get(f"{{{NS['r']}}}id")
-                return self._resolve_relationship(zf, rel_id)
-
-        raise ValueError(f"Sheet named '{sheet_name}' not found")
-
-    def _resolve_relationship(self, zf: zipfile.ZipFile, rel_id: str) -> str:
+    def _resolve_relationship(self, workbook: WorkbookIndex, rel_id: str) -> str:
         """Resolve a relationship ID to a file path"""
-        rels_xml = zf.read("xl/_rels/workbook.xml.rels")
-        rels_root = etree.fromstring(rels_xml)
-
-        for rel in rels_root.findall("rel:Relationship", namespaces=NS):
-            if rel.get("Id") == rel_id:
-                target = rel.get("Target")
-                if not target.startswith("xl/"):
-                    target = f"xl/{target}"
-                return target
+        _, rels = workbook
+        target = rels.get(rel_id)
+        if target is None:
+            raise ValueError(f"Relationship ID '{rel_id}' not found")
 
-        raise ValueError(f"Relationship ID '{rel_id}' not found")
+        if not target.startswith("xl/"):
+            target = f"xl/{target}"
+        return target
 
-    def _parse_shared_strings(self, xml_data: bytes) -> list:
-        """Parse shared strings table into a list"""
-        root = etree.fromstring(xml_data)
+    def _parse_shared_strings(self, xml_data: bytes) -> Tuple[list, Dict[str, int]]:
+        """Parse shared strings table into a list, plus a text -> first index lookup"""
         strings = []
 
-        for si in root.findall("ws:si", namespaces=NS):
-            # Handle simple text
-            t = si.find("ws:t", namespaces=NS)
-            if t is not None and t.text:
-                strings.append(t.text)
-            else:
-                # Handle rich text (multiple r elements)
-                rich_text = []
-                for r_elem in si.findall("ws:r", namespaces=NS):
-                    t_elem = r_elem.find("ws:t", namespaces=NS)
-                    if t_elem is not None and t_elem.text:
-                        rich_text.append(t_elem.text)
-                strings.append("".join(rich_text) if rich_text else "")
+        # Stream the table and drop each item once it is read, so memory
+        # stays flat however many strings the template has
+        context = etree.iterparse(
+            io.BytesIO(xml_data),
+            events=("end",),
+            tag=WS_SI,
+            huge_tree=True,
+            resolve_entities=False,
+            no_network=True,
+        )
+        for _, si in context:
+            # Handle simple text, else rich text (multiple r elements)
+            text = XPATH_SI_TEXT(si)
+            strings.append(text[0] if text else "".join(XPATH_RUN_TEXT(si)))
+            si.clear()
+            while si.getprevious() is not None:
+                del si.getparent()[0]
 
-        return strings
+        lookup = {}
+        for i, text in enumerate(strings):
+            lookup.setdefault(text, i)
+
+        return strings, lookup
 
     def _rebuild_shared_strings(self, string_table: list) -> bytes:
-        """Rebuild shared strings XML from list"""
-        root = etree.Element(
-            f"{{{NS['ws']}}}sst",
-            attrib={
-                "count": str(len(string_table)),
-                "uniqueCount": str(len(string_table))
-            },
-            nsmap={"": NS["ws"]}
-        )
+        """
+        Rebuild shared strings XML from list
 
-        for text in string_table:
-            si = etree.SubElement(root, f"{{{NS['ws']}}}si")
-            t = etree.SubElement(si, f"{{{NS['ws']}}}t")
-            t.text = str(text)
-            # Preserve space if text has leading/trailing whitespace
-            if text and (text[0].isspace() or text[-1].isspace()):
-                t.attrib["{http://www.w3.org/XML/1998/namespace}space"] = "preserve"
+        Written with lxml's incremental writer, so no element tree is built
+        for the whole table.
+        """
+        out_buf = io.BytesIO()
+        with etree.xmlfile(out_buf, encoding="UTF-8") as xf:
+            xf.write_declaration(standalone=True)
+            with xf.element(
+                WS_SST,
+                attrib={
+                    "count": str(len(string_table)),
+                    "uniqueCount": str(len(string_table))
+                },
+                nsmap={None: NS["ws"]}
+            ):
+                for text in string_table:
+                    text = str(text)
+                    t_attrib = {}
+                    # Preserve space if text has leading/trailing whitespace
+                    if text.startswith(_WS_BOUNDS) or text.endswith(_WS_BOUNDS):
+                        # Spelled with the reserved prefix: xmlfile would declare a
+                        # new prefix for the Clark-notation name
+                        t_attrib["xml:space"] = "preserve"
+                    with xf.element(WS_SI):
+                        with xf.element(WS_T, attrib=t_attrib):
+                            xf.write(text)
 
-        return etree.tostring(root, xml_declaration=True, encoding="UTF-8")
+        return out_buf.getvalue()
 
     def _update_cells(
         self,
         sheet_xml: bytes,
         cell_updates: Dict[str, Union[str, int, float]],
         string_table: list,
-        use_shared_strings: bool = False
+        use_shared_strings: bool = False,
+        string_lookup: Optional[Dict[str, int]] = None
     ) -> bytes:
         """
         Update specific cells in worksheet XML
@@ -197,132 +566,155 @@ class XLSXGenerator:
             cell_updates: Dict of cell references to values
             string_table: Shared strings table (modified in place)
             use_shared_strings: Whether to use shared strings for text values
+            string_lookup: Text -> index in string_table (modified in place;
+                built from string_table if None)
         """
-        root = etree.fromstring(sheet_xml)
-        sheet_data = root.find("ws:sheetData", namespaces=NS)
+        if string_lookup is None:
+            string_lookup = {}
+            for i, text in enumerate(string_table or ()):
+                string_lookup.setdefault(text, i)
+
+        # Apply updates in (row, column) order, so that rows and cells are
+        # found or created by walking forward through the sheet once instead
+        # of searching it for every cell reference
+        plan = []
+        for cell_ref, value in cell_updates.items():
+            col_num, row_num = _parse_cell_ref(cell_ref)
+            plan.append((row_num, col_num, cell_ref, value))
+        plan.sort(key=itemgetter(0, 1))
+
+        # While the sheet is parsed, find for each target row either the
+        # existing row with that number or the first row after it, which a
+        # new row gets inserted in front of
+        target_rows = sorted({row_num for row_num, _, _, _ in plan})
+        anchors: Dict[int, etree._Element] = {}
+        next_target = 0
+        context = etree.iterparse(
+            io.BytesIO(sheet_xml),
+            events=("end",),
+            tag=WS_ROW,
+            # Sheets can exceed libxml2's default size limits; IDs are never looked up
+            huge_tree=True,
+            collect_ids=False,
+            resolve_entities=False,
+            no_network=True,
+        )
+        for _, row in context:
+            row_num = int(row.get("r", 0))
+            while next_target < len(target_rows) and target_rows[next_target] <= row_num:
+                anchors[target_rows[next_target]] = row
+                next_target += 1
+
+        root = context.root
+        sheet_data = root.find(WS_SHEET_DATA)
 
         if sheet_data is None:
             raise ValueError("No sheetData element found in worksheet")
 
-        for cell_ref, value in cell_updates.items():
-            # Parse cell reference (e.g., "B3" -> row=3, col=B)
-            row_num = self._get_row_number(cell_ref)
-
-            # Find or create the row
-            row = self._find_or_create_row(sheet_data, row_num)
+        cell = None
+        for row_num, col_num, cell_ref, value in plan:
+            if cell is None or row_num != current_row_num:
+                # Find or create the row, then walk its cells from the start
+                current_row_num = row_num
+                row = self._find_or_create_row(sheet_data, row_num, anchors.get(row_num))
+                cells = _iter_cells(row)
+                cursor, cursor_col = next(cells, (None, 0))
+
+            # Advance to the first cell at or after this column
+            while cursor is not None and cursor_col < col_num:
+                cursor, cursor_col = next(cells, (None, 0))
+            if cursor is not None and cursor_col == col_num and cursor.get("r") != cell_ref:
+                # The cell is placed by position only; name it so it is
+                # updated in place rather than shadowed by a new cell
+                cursor.set("r", cell_ref)
 
             # Find or create the cell
-            cell = self._find_or_create_cell(row, cell_ref)
+            cell = self._find_or_create_cell(row, cell_ref, cursor)
 
             # Check if cell has a formula - preserve it
-            formula_elem = cell.find("ws:f", namespaces=NS)
+            formula_elem = cell.find(WS_F)
             if formula_elem is not None:
                 # This cell has a formula - skip updating to preserve calculation
                 continue
 
-            # Remove existing value elements
-            for child in list(cell):
-                if child.tag in (f"{{{NS['ws']}}}v", f"{{{NS['ws']}}}is"):
-                    cell.remove(child)
+            # Remove existing value elements in one child-list rewrite rather
+            # than one remove() scan per element
+            keep = [child for child in cell if child.tag not in (WS_V, WS_IS)]
+            if len(keep) != len(cell):
+                cell[:] = keep
 
             # Set the new value
             if isinstance(value, (int, float)) and not isinstance(value, bool):
                 # Numeric cell
                 cell.attrib.pop("t", None)
-                v_el = etree.SubElement(cell, f"{{{NS['ws']}}}v")
+                v_el = etree.SubElement(cell, WS_V)
                 v_el.text = str(value)
             else:
                 # String cell
                 if use_shared_strings and string_table is not None:
                     # Use shared strings table
                     str_val = str(value)
-                    if str_val in string_table:
-                        str_idx = string_table.index(str_val)
-                    else:
+                    str_idx = string_lookup.get(str_val)
+                    if str_idx is None:
                         str_idx = len(string_table)
                         string_table.append(str_val)
+                        string_lookup[str_val] = str_idx
 
                     cell.attrib["t"] = "s"
-                    v_el = etree.SubElement(cell, f"{{{NS['ws']}}}v")
+                    v_el = etree.SubElement(cell, WS_V)
                     v_el.text = str(str_idx)
                 else:
                     # Inline string
                     cell.attrib["t"] = "str"
-                    v_el = etree.SubElement(cell, f"{{{NS['ws']}}}v")
+                    v_el = etree.SubElement(cell, WS_V)
                     v_el.text = str(value)
 
         return etree.tostring(root, xml_declaration=False, encoding="utf-8")
 
-    def _get_row_number(self, cell_ref: str) -> int:
-        """Extract row number from cell reference (e.g., 'B3' -> 3)"""
-        import re
-        match = re.match(r"[A-Z]+(\d+)", cell_ref)
-        if not match:
-            raise ValueError(f"Invalid cell reference: {cell_ref}")
-        return int(match.group(1))
-
-    def _find_or_create_row(self, sheet_data: etree.Element, row_num: int) -> etree.Element:
-        """Find existing row or create new one"""
-        for row in sheet_data.findall("ws:row", namespaces=NS):
-            if int(row.get("r", 0)) == row_num:
-                return row
-
-        # Create new row in correct position
-        new_row = etree.Element(f"{{{NS['ws']}}}row", attrib={"r": str(row_num)})
-
-        # Insert in correct position (sorted by row number)
-        inserted = False
-        for i, row in enumerate(sheet_data.findall("ws:row", namespaces=NS)):
-            if int(row.get("r", 0)) > row_num:
-                sheet_data.insert(i, new_row)
-                inserted = True
-                break
-
-        if not inserted:
+    def _find_or_create_row(
+        self,
+        sheet_data: etree.Element,
+        row_num: int,
+        anchor: Optional[etree._Element]
+    ) -> etree.Element:
+        """
+        Find existing row or create new one
+
+        anchor is the row numbered row_num, or else the first row after it
+        (None if there is none).
+        """
+        if anchor is not None and int(anchor.get("r", 0)) == row_num:
+            return anchor
+
+        # Create new row in correct position (sorted by row number)
+        new_row = etree.Element(WS_ROW, attrib={"r": str(row_num)})
+        if anchor is not None:
+            anchor.addprevious(new_row)
+        else:
             sheet_data.append(new_row)
 
         return new_row
 
-    def _find_or_create_cell(self, row: etree.Element, cell_ref: str) -> etree.Element:
-        """Find existing cell or create new one"""
-        for cell in row.findall("ws:c", namespaces=NS):
-            if cell.get("r") == cell_ref:
-                return cell
-
-        # Create new cell
-        new_cell = etree.Element(f"{{{NS['ws']}}}c", attrib={"r": cell_ref})
+    def _find_or_create_cell(
+        self,
+        row: etree.Element,
+        cell_ref: str,
+        cursor: Optional[etree._Element]
+    ) -> etree.Element:
+        """
+        Find existing cell or create new one
 
-        # Insert in correct position (sorted by column)
-        inserted = False
-        for i, cell in enumerate(row.findall("ws:c", namespaces=NS)):
-            if self._compare_cell_refs(cell_ref, cell.get("r", "")) < 0:
-                row.insert(i, new_cell)
-                inserted = True
-                break
+        cursor is the row's first cell at or after cell_ref's column (None if
+        there is none).
+        """
+        if cursor is not None and cursor.get("r") == cell_ref:
+            return cursor
 
-        if not inserted:
+        # Create new cell in correct position (sorted by column)
+        new_cell = etree.Element(WS_C, attrib={"r": cell_ref})
+        if cursor is not None:
+            cursor.addprevious(new_cell)
+        else:
             row.append(new_cell)
 
         return new_cell
-
-    def _compare_cell_refs(self, ref1: str, ref2: str) -> int:
-        """Compare two cell references for sorting (-1, 0, 1)"""
-        import re
-
-        match1 = re.match(r"([A-Z]+)(\d+)", ref1)
-        match2 = re.match(r"([A-Z]+)(\d+)", ref2)
-
-        if not match1 or not match2:
-            return 0
-
-        col1, row1 = match1.groups()
-        col2, row2 = match2.groups()
-
-        # Compare columns first
-        if col1 < col2:
-            return -1
-        elif col1 > col2:
-            return 1
-        else:
-            # Same column, compare rows
-            return int(row1) - int(row2)
@@ -1,8 +1,10 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import Dict, Union
+from typing import Dict, Tuple, Union
 import io
 import base64
+import copy
+import functools
 import zipfile
 from lxml import etree
 from pathlib import Path
@@ -13,6 +15,10 @@ app = FastAPI()
 # Where templates are mounted inside the container
 TEMPLATE_DIR = Path("/templates")
 
+# Generated files are sent once and never archived, so favour deflate speed
+# over ratio; level 1 stays within a few percent of the default level 6
+ZIP_COMPRESSLEVEL = 1
+
 # Namespace constants for Excel XML
 NS = {
     "ws": "http://schemas.openxmlformats.org/spreadsheetml/2006/main",
@@ -20,6 +26,9 @@ NS = {
     "rel": "http://schemas.openxmlformats.org/package/2006/relationships",
 }
 
+# Compiled once; the cell ref is bound per call via the $ref variable
+_CELL_XPATH = etree.XPath("ws:sheetData/ws:row/ws:c[@r=$ref]", namespaces=NS)
+
 # 🔧 FIELD → CELL mappings per template
 # TODO: update the cell refs to match your actual template layout
 TEMPLATE_FIELD_MAP: Dict[str, Dict[str, str]] = {
@@ -85,6 +94,28 @@ def _find_sheet_path(zf: zipfile.ZipFile, sheet_name: str) -> str:
     return target
 
 
+@functools.lru_cache(maxsize=32)
+def _resolve_sheet_path(template_path: str, mtime_ns: int, sheet_name: str) -> str:
+    """
+    Cached _find_sheet_path for a template on disk. Templates rarely change, so
+    workbook.xml and its rels are parsed once; mtime_ns is part of the cache
+    key so replacing a template invalidates its entry.
+    """
+    with zipfile.ZipFile(template_path, "r") as zf:
+        return _find_sheet_path(zf, sheet_name)
+
+
+@functools.lru_cache(maxsize=8)
+def _load_template(template_path: str, mtime_ns: int) -> Tuple[Tuple[zipfile.ZipInfo, bytes], ...]:
+    """
+    Read and decompress every entry of a template once, as (ZipInfo, data)
+    pairs in archive order. Cached per mtime_ns like _resolve_sheet_path; the
+    cached ZipInfo objects are shared between requests and must not be modified.
+    """
+    with zipfile.ZipFile(template_path, "r") as zin:
+        return tuple((item, zin.read(item)) for item in zin.infolist())
+
+
 def _update_cells(sheet_xml: bytes, cell_updates: Dict[str, Union[str, int, float]]) -> bytes:
     """
     Update specific cells in a sheet's XML, preserving styles and formatting.
@@ -95,10 +126,11 @@ def _update_cells(sheet_xml: bytes, cell_updates: Dict[str, Union[str, int, floa
 
     for cell_ref, value in cell_updates.items():
         # Find the <c> element with r="C6" etc.
-        c = root.find(f".//ws:c[@r='{cell_ref}']", namespaces=NS)
-        if c is None:
+        matches = _CELL_XPATH(root, ref=cell_ref)
+        if not matches:
             # For now, fail loudly; you can relax this later if you want.
             raise ValueError(f"Cell {cell_ref} not found in sheet XML")
+        c = matches[0]
 
         # Remove existing <v> or <is> children
         for child in list(c):
@@ -144,20 +176,20 @@ def generate_xlsx(payload: GeneratePayload):
         raise HTTPException(status_code=400, detail="No matching fields for template")
 
     # Work entirely in memory
-    out_buf = io.BytesIO()
-
-    with zipfile.ZipFile(template_path, "r") as zin, \
-            zipfile.ZipFile(out_buf, "w", compression=zipfile.ZIP_DEFLATED) as zout:
+    # Find the path for the 'Maintenance Template' sheet, or just use the first sheet
+    # If your template always uses that name, you can hardcode it.
+    mtime_ns = template_path.stat().st_mtime_ns
+    try:
+        sheet_path = _resolve_sheet_path(str(template_path), mtime_ns, "Maintenance Template")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error locating sheet: {e}")
 
-        # Find the path for the 'Maintenance Template' sheet, or just use the first sheet
-        # If your template always uses that name, you can hardcode it.
-        try:
-            sheet_path = _find_sheet_path(zin, sheet_name="Maintenance Template")
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error locating sheet: {e}")
+    out_buf = io.BytesIO()
 
-        for item in zin.infolist():
-            data = zin.read(item.filename)
+    with zipfile.ZipFile(
+        out_buf, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=ZIP_COMPRESSLEVEL
+    ) as zout:
+        for item, data in _load_template(str(template_path), mtime_ns):
             if item.filename == sheet_path:
                 # Patch the sheet XML with our new values
                 try:
@@ -165,11 +197,12 @@ def generate_xlsx(payload: GeneratePayload):
                 except Exception as e:
                     raise HTTPException(status_code=500, detail=f"Error updating cells: {e}")
 
-            zout.writestr(item, data)
+            # writestr fills in sizes and offsets, so give it a copy of the cached info.
+            # It also ignores the archive's compresslevel for a ZipInfo, hence passing it.
+            zout.writestr(copy.copy(item), data, compresslevel=ZIP_COMPRESSLEVEL)
 
-    out_buf.seek(0)
-    xlsx_bytes = out_buf.getvalue()
-    b64 = base64.b64encode(xlsx_bytes).decode("ascii")
+    # Encode straight from the buffer's memory rather than a getvalue() copy
+    b64 = base64.b64encode(out_buf.getbuffer()).decode("ascii")
 
     file_name = f"lease-summary-{payload.fields.get('msn', '') or int(dt.datetime.utcnow().timestamp())}.xlsx"
 
@@ -13,6 +13,7 @@ import sys
 import zipfile
 import argparse
 from pathlib import Path
+from xml.parsers import expat
 from lxml import etree
 import json
 
@@ -49,36 +50,65 @@ def parse_shared_strings(zf: zipfile.ZipFile) -> list:
     return strings
 
 
+def scan_elements(xml_data: bytes, tags: set) -> list:
+    """
+    Return (tag, attributes) for every element whose tag is in tags
+
+    Tags and namespaced attribute names are "uri}local". Uses expat, since
+    only a few attributes are needed from the workbook parts.
+    """
+    found = []
+
+    def start(name, attrs):
+        if name in tags:
+            found.append((name, attrs))
+
+    parser = expat.ParserCreate(namespace_separator="}")
+    parser.StartElementHandler = start
+    parser.Parse(xml_data, True)
+    return found
+
+
+def read_sheets(zf: zipfile.ZipFile):
+    """Return [(sheet name, relationship ID), ...] in workbook order, or None without <sheets>"""
+    sheets_tag = f"{NS['ws']}}}sheets"
+    sheet_tag = f"{NS['ws']}}}sheet"
+    elements = scan_elements(zf.read("xl/workbook.xml"), {sheets_tag, sheet_tag})
+    if not any(tag == sheets_tag for tag, _ in elements):
+        return None
+
+    rel_id_attr = f"{NS['r']}}}id"
+    return [
+        (attrs.get("name"), attrs.get(rel_id_attr))
+        for tag, attrs in elements
+        if tag == sheet_tag
+    ]
+
+
 def find_sheet_path(zf: zipfile.ZipFile, sheet_name: str = None) -> str:
     """Find worksheet path by name, or return first sheet"""
-    workbook_xml = zf.read("xl/workbook.xml")
-    wb_root = etree.fromstring(workbook_xml)
-
-    sheets_el = wb_root.find("ws:sheets", namespaces=NS)
-    if sheets_el is None:
+    sheets = read_sheets(zf)
+    if sheets is None:
         raise ValueError("Unable to find <sheets> element")
 
     # Get target sheet
-    target_sheet = None
     if sheet_name:
-        for sheet in sheets_el.findall("ws:sheet", namespaces=NS):
-            if sheet.get("name") == sheet_name:
-                target_sheet = sheet
-                break
-        if not target_sheet:
+        rel_ids = [rel_id for name, rel_id in sheets if name == sheet_name]
+        if not rel_ids:
             raise ValueError(f"Sheet '{sheet_name}' not found")
+        rel_id = rel_ids[0]
     else:
-        target_sheet = sheets_el.find("ws:sheet", namespaces=NS)
-
-    rel_id = target_sheet.get(f"{{{NS['r']}}}id")
+        if not sheets:
+            raise ValueError("No sheets found in workbook")
+        rel_id = sheets[0][1]
 
     # Resolve relationship
+    relationship_tag = f"{NS['rel']}}}Relationship"
     rels_xml = zf.read("xl/_rels/workbook.xml.rels")
-    rels_root = etree.fromstring(rels_xml)
 
-    for rel in rels_root.findall("rel:Relationship", namespaces=NS):
-        if rel.get("Id") == rel_id:
-            target = rel.get("Target")
+    for _, attrs in scan_elements(rels_xml, {relationship_tag}):
+        if attrs.get("Id") == rel_id:
+            target = attrs.get("Target")
             if not target.startswith("xl/"):
                 target = f"xl/{target}"
             return target
@@ -88,66 +118,108 @@ def find_sheet_path(zf: zipfile.ZipFile, sheet_name: str = None) -> str:
 
 def list_sheets(zf: zipfile.ZipFile) -> list:
     """List all sheet names in workbook"""
-    workbook_xml = zf.read("xl/workbook.xml")
-    wb_root = etree.fromstring(workbook_xml)
-
-    sheets_el = wb_root.find("ws:sheets", namespaces=NS)
-    if sheets_el is None:
-        return []
-
-    return [sheet.get("name") for sheet in sheets_el.findall("ws:sheet", namespaces=NS)]
+    return [name for name, _ in read_sheets(zf) or []]
 
 
 def analyze_sheet(zf: zipfile.ZipFile, sheet_path: str, shared_strings: list) -> list:
-    """Analyze sheet and return cells with their values"""
-    sheet_xml = zf.read(sheet_path)
-    root = etree.fromstring(sheet_xml)
+    """
+    Analyze sheet and return cells with their values
 
-    cells = []
-    for c in root.findall(".//ws:c", namespaces=NS):
-        cell_ref = c.get("r")
-        cell_type = c.get("t", "n")  # Default to numeric
-
-        v_elem = c.find("ws:v", namespaces=NS)
-        f_elem = c.find("ws:f", namespaces=NS)
-
-        value = None
-        value_type = "empty"
-
-        if f_elem is not None:
-            # Formula cell
-            value = f"=FORMULA={f_elem.text or ''}"
-            value_type = "formula"
-        elif v_elem is not None and v_elem.text:
-            if cell_type == "s":
-                # Shared string
-                idx = int(v_elem.text)
-                if idx < len(shared_strings):
-                    value = shared_strings[idx]
-                    value_type = "string"
-            elif cell_type == "str":
-                # Inline string
-                value = v_elem.text
-                value_type = "string"
-            elif cell_type == "b":
-                # Boolean
-                value = v_elem.text == "1"
-                value_type = "boolean"
-            else:
-                # Numeric
-                value = v_elem.text
-                value_type = "number"
+    The sheet is streamed through expat, collecting each cell's attributes
+    and the text of its <v> and <f> children; no element tree is built.
+    """
+    c_tag = f"{NS['ws']}}}c"
+    value_tags = (f"{NS['ws']}}}v", f"{NS['ws']}}}f")
 
-        if value is not None:
-            cells.append({
-                "ref": cell_ref,
-                "type": value_type,
-                "value": value
-            })
+    cells = []
+    cell = None     # attributes of the <c> being read
+    depth = 0       # element depth below that <c>
+    fields = {}     # v/f tag -> text of the cell's first such child
+    text = None     # text collected for the child being read
+
+    def start(name, attrs):
+        nonlocal cell, depth, text
+        if cell is None:
+            if name == c_tag:
+                cell, depth = attrs, 0
+                fields.clear()
+            return
+        depth += 1
+        if depth == 1 and name in value_tags:
+            text = []
+
+    def char_data(data):
+        if text is not None:
+            text.append(data)
+
+    def end(name):
+        nonlocal cell, depth, text
+        if cell is None:
+            return
+        if depth == 0:
+            entry = cell_entry(cell, fields.get(value_tags[0]), fields.get(value_tags[1]), shared_strings)
+            if entry is not None:
+                cells.append(entry)
+            cell = None
+            return
+        if depth == 1 and text is not None:
+            fields.setdefault(name, "".join(text))
+            text = None
+        depth -= 1
+
+    parser = expat.ParserCreate(namespace_separator="}")
+    parser.buffer_text = True
+    parser.StartElementHandler = start
+    parser.EndElementHandler = end
+    parser.CharacterDataHandler = char_data
+    with zf.open(sheet_path) as sheet_file:
+        parser.ParseFile(sheet_file)
 
     return cells
 
 
+def cell_entry(attrs: dict, v_text, f_text, shared_strings: list):
+    """Describe one cell from its attributes and <v>/<f> text, or None if it has no value"""
+    cell_ref = attrs.get("r")
+    cell_type = attrs.get("t", "n")  # Default to numeric
+
+    value = None
+    value_type = "empty"
+
+    if f_text is not None:
+        # Formula cell
+        value = f"=FORMULA={f_text}"
+        value_type = "formula"
+    elif v_text:
+        if cell_type == "s":
+            # Shared string
+            idx = int(v_text)
+            if idx < len(shared_strings):
+                value = shared_strings[idx]
+                value_type = "string"
+        elif cell_type == "str":
+            # Inline string
+            value = v_text
+            value_type = "string"
+        elif cell_type == "b":
+            # Boolean
+            value = v_text == "1"
+            value_type = "boolean"
+        else:
+            # Numeric
+            value = v_text
+            value_type = "number"
+
+    if value is None:
+        return None
+
+    return {
+        "ref": cell_ref,
+        "type": value_type,
+        "value": value
+    }
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Analyze Excel template and generate field mappings"
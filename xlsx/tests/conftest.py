@@ -0,0 +1,57 @@
+"""
+Shared fixtures: small XLSX templates built on the fly
+"""
+
+import zipfile
+from pathlib import Path
+
+import pytest
+
+
+WS_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+
+SHEET_XML = (
+    f'<worksheet xmlns="{WS_NS}" xmlns:r="{R_NS}"><sheetData>'
+    '<row r="3"><c r="B3" s="1" t="str"><v>MSN</v></c><c r="C3" s="2"><v>7</v></c>'
+    '<c r="D3"><f>C3*2</f><v>14</v></c></row>'
+    '<row r="5"><c r="B5" s="1"/></row>'
+    "</sheetData></worksheet>"
+)
+
+
+def build_template(path: Path, shared_strings=None, styles: str = "<styleSheet/>") -> Path:
+    """Write a minimal workbook with a 'Maintenance Template' sheet to path"""
+    parts = {
+        "[Content_Types].xml": "<Types/>",
+        "xl/workbook.xml": (
+            f'<workbook xmlns="{WS_NS}" xmlns:r="{R_NS}"><sheets>'
+            '<sheet name="Maintenance Template" sheetId="1" r:id="rId1"/>'
+            '<sheet name="Notes" sheetId="2" r:id="rId2"/>'
+            "</sheets></workbook>"
+        ),
+        "xl/_rels/workbook.xml.rels": (
+            f'<Relationships xmlns="{REL_NS}">'
+            '<Relationship Id="rId1" Target="worksheets/sheet1.xml"/>'
+            '<Relationship Id="rId2" Target="worksheets/sheet2.xml"/>'
+            "</Relationships>"
+        ),
+        "xl/worksheets/sheet1.xml": SHEET_XML,
+        "xl/worksheets/sheet2.xml": f'<worksheet xmlns="{WS_NS}"><sheetData/></worksheet>',
+        "xl/styles.xml": styles,
+    }
+    if shared_strings is not None:
+        items = "".join(f"<si><t>{text}</t></si>" for text in shared_strings)
+        parts["xl/sharedStrings.xml"] = f'<sst xmlns="{WS_NS}">{items}</sst>'
+
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for name, data in parts.items():
+            zf.writestr(name, data)
+    return path
+
+
+@pytest.fixture
+def template_path(tmp_path):
+    """Template without a shared strings table"""
+    return build_template(tmp_path / "Template.xlsx")
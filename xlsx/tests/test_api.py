@@ -2,9 +2,13 @@
 API endpoint tests
 """
 
+import base64
+
 import pytest
 from fastapi.testclient import TestClient
+from app import main
 from app.main import app
+from tests.conftest import build_template
 
 client = TestClient(app)
 
@@ -77,6 +81,32 @@ def test_generate_xlsx_invalid_return_format():
             "return_format": "invalid_format"
         }
     )
-    # Should still work, but return base64 by default
-    # Or fail with validation error
-    assert response.status_code in [200, 400, 404, 422]
+    # Rejected by validation rather than falling back to a format
+    assert response.status_code == 422
+
+
+def test_generate_xlsx_returns_file_by_default(tmp_path, monkeypatch):
+    """Test that the XLSX is returned as raw bytes unless base64 is requested"""
+    build_template(tmp_path / "Template.xlsx")
+    monkeypatch.setattr(main, "TEMPLATE_DIR", tmp_path)
+
+    response = client.post(
+        "/generate-xlsx",
+        json={"template_name": "Template.xlsx", "data": {"msn": "MSN12345"}},
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith(
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+    )
+    assert response.content[:2] == b"PK"
+
+    response = client.post(
+        "/generate-xlsx",
+        json={
+            "template_name": "Template.xlsx",
+            "data": {"msn": "MSN12345"},
+            "return_format": "base64"
+        }
+    )
+    assert response.status_code == 200
+    assert base64.b64decode(response.json()["data"])[:2] == b"PK"